@@ -11,18 +11,6 @@ import storm_analysis.daostorm_3d.mufit_analysis as mfit
 
 daop = params.ParametersDAO().initFromFile("example.xml")
 
-# For this data-set, no localizations will be found if threshold is above 25.0
-daop.changeAttr("threshold", 8)
-
-daop.changeAttr("find_max_radius", 5) # original value is 5 (pixels)
-daop.changeAttr("roi_size", 9) # original value is 9 (pixels)
-daop.changeAttr("sigma", 1.5) # original value is 1.5 (pixels)
-
-# Save the changed parameters.
-#
-# Using pretty = True will create a more human readable XML file. The default value is False.
-#
-
 # For this data-set, no localizations will be found if threshold is above 25.0
 daop.changeAttr("threshold", 3)
 
@@ -32,10 +20,9 @@ daop.changeAttr("sigma", 1.5) # original value is 1.5 (pixels)
 
 # Save the changed parameters.
 #
-# Using pretty = True will create a more human readable XML file. The default value is False.
+# This file is only read by the analysis, so it is not pretty printed.
 #
-daop.toXMLFile("testing.xml", pretty = True)
-daop.toXMLFile("testing.xml", pretty = True)
+daop.toXMLFile("testing.xml", pretty = False)
 
 if os.path.exists("testing.hdf5"):
     os.remove("testing.hdf5")
@@ -9,7 +9,7 @@ they must be converted to nanometers.
 
 Hazen 01/18
 """
-import copy
+import concurrent.futures
 import matplotlib
 import matplotlib.pyplot as pyplot
 import numpy
@@ -19,6 +19,12 @@ import scipy.optimize
 from xml.dom import minidom
 from xml.etree import ElementTree
 
+# lxml is optional, it is only used to speed up pretty printing.
+try:
+    from lxml import etree as lxmlETree
+except ImportError:
+    lxmlETree = None
+
 import storm_analysis
 import storm_analysis.sa_library.sa_h5py as saH5Py
 
@@ -70,17 +76,12 @@ def convertUnits(ww_params, pixel_size):
     Convert to the units currently used by the analysis pipeline. This also
     adds additional zeros as needed to match the length expected by the
     analysis pipeline.
-    """
-    ww_params = copy.copy(ww_params)
-    
-    ww_params[0] = ww_params[0] * pixel_size
-    ww_params[1] = ww_params[1] * 1.0e+3
-    ww_params[2] = ww_params[2] * 1.0e+3
 
-    for i in range(len(ww_params), 7):
-        ww_params.append(0.0)
-        
-    return ww_params
+    ww_params can be a list or a numpy array, a new list is returned.
+    """
+    ww_params = numpy.array(ww_params, dtype = numpy.float64)
+    ww_params[:3] *= numpy.array([pixel_size, 1.0e+3, 1.0e+3])
+    return numpy.pad(ww_params, (0, max(0, 7 - ww_params.size))).tolist()
 
     
 def doFit(w, z, z_params, n_additional):
@@ -119,25 +120,61 @@ def doFit(w, z, z_params, n_additional):
     return zfit.tolist()
 
 
-def doSingleFit(w, z, z_params, n_additional):
+def doSingleFit(w, z, z_params, n_additional, bounded = True):
     """
     w - Numpy array containing localizations widths in pixels.
     z - Numpy array containing localization z positions in microns.
     z_params - Initial guess for the fitting parameters [pixels, microns, microns].
     n_additional - The number of additional fitting parameters to use,
                    these are 'A,B,C,D'.
-    """
+    bounded - Constrain the parameters to physically reasonable ranges
+              using the 'trf' method, otherwise do an unconstrained fit
+              with the 'lm' method.
+    """
+    # The residual and the Jacobian are usually evaluated at the same
+    # point, so the powers of X are cached and only recalculated when
+    # c or d change.
+    cache = {"cd" : None, "x_powers" : None}
+
+    def getXPowers(fit_p, z):
+        cd = (fit_p[1], fit_p[2])
+        if (cd != cache["cd"]):
+            cache["cd"] = cd
+            cache["x_powers"] = _zcalibXPowers(fit_p, z)
+        return cache["x_powers"]
+
     def zcalib_fitter(fit_p, w, z):
-        return zcalib_fitters[n_additional](fit_p, z) - w
+        x_powers = getXPowers(fit_p, z)
+        return fit_p[0]*numpy.sqrt(1.0 + x_powers[1] + numpy.dot(fit_p[3:], x_powers[2:])) - w
+
+    def zcalib_jacobian(fit_p, w, z):
+        return _zcalibJacobian(fit_p, z, x_powers = getXPowers(fit_p, z))
 
     # Add additional fitting parameters.
     for i in range(n_additional):
         z_params.append(0.0)
-    [results, success] = scipy.optimize.leastsq(zcalib_fitter, z_params, args=(w, z))
-    if (success < 1) or (success > 4):
+
+    if bounded:
+        lower = numpy.array([0.0, -1.0, 0.05] + [-10.0]*n_additional)
+        upper = numpy.array([numpy.inf, 1.0, 2.0] + [10.0]*n_additional)
+        res = scipy.optimize.least_squares(zcalib_fitter,
+                                           numpy.clip(z_params, lower, upper),
+                                           jac = zcalib_jacobian,
+                                           args = (w, z),
+                                           method = 'trf',
+                                           bounds = (lower, upper),
+                                           x_scale = 'jac')
+    else:
+        res = scipy.optimize.least_squares(zcalib_fitter,
+                                           z_params,
+                                           jac = zcalib_jacobian,
+                                           args = (w, z),
+                                           method = 'lm',
+                                           x_scale = 'jac')
+    if (res.status < 1):
         return None
     else:
-        return results
+        return res.x
 
 
 def fitDefocusingCurves(wx, wy, z, n_additional = 0, z_params = None):
@@ -155,11 +192,14 @@ def fitDefocusingCurves(wx, wy, z, n_additional = 0, z_params = None):
     else:
         z_params = [3.0, 0.3, 0.5]
 
-    # Fit for defocusing parameters.
-    wx_params = doFit(wx, z, z_params, n_additional)
-    wy_params = doFit(wy, z, z_params, n_additional)
-    
-    return [wx_params, wy_params]
+    # Fit for defocusing parameters. The wx and wy fits are independent
+    # so they are done in parallel. doFit() modifies z_params, so each
+    # fit gets its own copy.
+    with concurrent.futures.ThreadPoolExecutor(max_workers = 2) as executor:
+        wx_future = executor.submit(doFit, wx, z, list(z_params), n_additional)
+        wy_future = executor.submit(doFit, wy, z, list(z_params), n_additional)
+
+        return [wx_future.result(), wy_future.result()]
 
 
 def fitTilt(h5_name, start = 0, stop = 1):
@@ -206,32 +246,44 @@ def loadWxWyZData(h5_name, zfile_name, wx_wy_fields = ["xsigma", "ysigma"], stag
     #
     z_data = numpy.loadtxt(zfile_name, ndmin = 2)
 
-    # Create arrays with wx, wy, z data.
-    wx = None
-    wy = None
-    z = None
+    # Only frames that will be used are loaded. The z offsets are then
+    # expanded to one value per localization in a single step.
+    valid_frames = numpy.nonzero(z_data[:,0].astype(int))[0]
+
+    # Create arrays with wx, wy, z data. These are accumulated in lists
+    # and concatenated once at the end.
+    wx = []
+    wy = []
+    x = []
+    y = []
+    frames = []
+    counts = []
     with saH5Py.SAH5Py(h5_name) as h5:
         pixel_size = h5.getPixelSize()
-        for curf, locs in h5.localizationsIterator(fields = wx_wy_fields + ["x", "y"]):
-            if (int(z_data[curf,0]) == 0):
+        for curf in valid_frames:
+            locs = h5.getLocalizationsInFrame(int(curf),
+                                              drift_corrected = True,
+                                              fields = wx_wy_fields + ["x", "y"])
+            if not bool(locs):
                 continue
 
-            # Calculate stage tilt corrected z values.
-            tz = tiltCompensation(locs["x"],
-                                  locs["y"],
-                                  numpy.ones(locs["x"].size) * z_data[curf, 1],
-                                  stage_tilt)
+            wx.append(2.0 * locs[wx_field])
+            wy.append(2.0 * locs[wy_field])
+            x.append(locs["x"])
+            y.append(locs["y"])
+            frames.append(curf)
+            counts.append(locs["x"].size)
+
+    if (len(frames) == 0):
+        return [numpy.empty(0), numpy.empty(0), numpy.empty(0), pixel_size]
 
-            if wx is None:
-                wx = 2.0 * locs[wx_field]
-                wy = 2.0 * locs[wy_field]
-                z = tz
-            else:
-                wx = numpy.concatenate((wx, 2.0 * locs[wx_field]))
-                wy = numpy.concatenate((wy, 2.0 * locs[wy_field]))
-                z = numpy.concatenate((z, tz))
+    # Calculate stage tilt corrected z values.
+    z = tiltCompensation(numpy.concatenate(x),
+                         numpy.concatenate(y),
+                         numpy.repeat(z_data[frames,1], counts),
+                         stage_tilt)
 
-    return [wx, wy, z, pixel_size]
+    return [numpy.concatenate(wx), numpy.concatenate(wy), z, pixel_size]
 
 
 def plotFit(wx, wy, z, t_wx, t_wy, t_z, wx_params, wy_params, z_range = 0.6):
@@ -250,9 +302,8 @@ def plotFit(wx, wy, z, t_wx, t_wy, t_z, wx_params, wy_params, z_range = 0.6):
     
     z_fit = numpy.arange(-z_range, z_range + 0.001, 0.01)
 
-    zfn = zcalib_fitters[len(wx_params) - 3]
-    wx_fit = zfn(wx_params, z_fit)
-    wy_fit = zfn(wy_params, z_fit)
+    wx_fit = zcalib(wx_params, z_fit)
+    wy_fit = zcalib(wy_params, z_fit)
 
     # Plot discarded points in grey.
     pyplot.scatter(pz, wx, color = 'lightgray', s = 1)
@@ -282,28 +333,37 @@ def prettyPrint(wx_params, wy_params, pixel_size):
     wx_params = convertUnits(wx_params, pixel_size)
     wy_params = convertUnits(wy_params, pixel_size)
 
-    # Create XML.
-    etree = ElementTree.Element("xml")
+    # Create XML, using lxml if it is available.
+    et = ElementTree
+    if lxmlETree is not None:
+        et = lxmlETree
+
+    etree = et.Element("xml")
     for i, elt in enumerate([wx_params, wy_params]):
         txt1 = "wx"
         if (i == 1):
             txt1 = "wy"
         for j, txt2 in enumerate(["_wo", "_c", "_d", "A", "B", "C", "D"]):
-            tmp = ElementTree.SubElement(etree, txt1 + txt2)
+            tmp = et.SubElement(etree, txt1 + txt2)
             tmp.text = "{0:0.3f}".format(elt[j])
 
     # Pretty print it.
-    reparsed = minidom.parseString(ElementTree.tostring(etree))
-    print(reparsed.toprettyxml(indent = "   ", encoding = "ISO-8859-1").decode())
+    if lxmlETree is not None:
+        print(lxmlETree.tostring(etree,
+                                 encoding = "ISO-8859-1",
+                                 pretty_print = True,
+                                 xml_declaration = True).decode("ISO-8859-1"))
+    else:
+        reparsed = minidom.parseString(ElementTree.tostring(etree))
+        print(reparsed.toprettyxml(indent = "   ", encoding = "ISO-8859-1").decode())
 
 
 def removeOutliers(wx, wy, z, wx_params, wy_params, threshold):
     """
     This removes all wx, wy that are more than threshold sigma from the fit curve.
     """
-    zfn = zcalib_fitters[len(wx_params) - 3]
-    wx_fit = zfn(wx_params, z)
-    wy_fit = zfn(wy_params, z)
+    wx_fit = zcalib(wx_params, z)
+    wy_fit = zcalib(wy_params, z)
 
     wx_dev = numpy.std(wx_fit - wx)
     wy_dev = numpy.std(wy_fit - wy)
@@ -349,45 +409,100 @@ def tiltCompensation(x, y, z, stage_tilt):
                            
 # These are the different defocus curve fitting functions.
 #
+def zcalib(p, z):
+    """
+    Z calibration fitting function, the number of additional parameters
+    (A,B,C,D) is determined by the length of p.
+
+    The polynomial is evaluated in place using Horner's method, i.e.
+    1 + X*X*(1 + X*(A + X*(B + ..))), to avoid the power calls and
+    temporary arrays of the direct expansion.
+    """
+    X = (z - p[1])*(1.0/p[2])
+    poly = numpy.zeros_like(X)
+    for coeff in reversed(p[3:]):
+        poly += coeff
+        poly *= X
+    poly += 1.0
+    poly *= X
+    poly *= X
+    poly += 1.0
+    return p[0]*numpy.sqrt(poly, out = poly)
+
+def _zcalibJacobian(p, z, x_powers = None):
+    """
+    Analytic Jacobian of zcalib() with respect to the parameters,
+    returned as a (z.size, len(p)) array.
+
+    With Q = 1 + X^2 + A*X^3 + .. and X = (z - c)/d the derivatives
+    follow from d(wo*sqrt(Q))/dp = wo/(2*sqrt(Q)) * dQ/dp.
+
+    x_powers - (Optional) the powers of X from _zcalibXPowers().
+    """
+    if x_powers is None:
+        x_powers = _zcalibXPowers(p, z)
+
+    p = numpy.asarray(p)
+    X = x_powers[0]
+    Q = 1.0 + x_powers[1] + numpy.dot(p[3:], x_powers[2:])
+    dQ = 2.0*X + numpy.dot(numpy.arange(3, p.size)*p[3:], x_powers[1:-1])
+
+    sQ = numpy.sqrt(Q)
+    t = 0.5*p[0]/sQ
+
+    jac = numpy.empty((X.size, p.size))
+    jac[:,0] = sQ
+    jac[:,1] = -t*dQ/p[2]
+    jac[:,2] = -t*dQ*X/p[2]
+    jac[:,3:] = (t*x_powers[2:]).T
+    return jac
+
+def _zcalibXPowers(p, z):
+    """
+    Returns X, X^2, .., X^(len(p)-1) with X = (z - c)/d as the rows of
+    a (len(p)-1, z.size) array.
+    """
+    X = (z - p[1])*(1.0/p[2])
+    x_powers = numpy.empty((len(p) - 1, X.size))
+    x_powers[0] = X
+    for i in range(1, len(p) - 1):
+        numpy.multiply(x_powers[i-1], X, out = x_powers[i])
+    return x_powers
+
 def zcalib0(p, z):
     """
     Z calibration fitting function with no additional parameters.
     """
-    wo,c,d = p
-    X = (z-c)/d
-    return wo*numpy.sqrt(1.0 + numpy.power(X,2))
+    assert(len(p) == 3)
+    return zcalib(p, z)
 
 def zcalib1(p, z):
     """
     Z calibration fitting function with 1 additional parameters.
     """
-    wo,c,d,A = p
-    X = (z-c)/d
-    return wo*numpy.sqrt(1.0 + numpy.power(X,2) + A * numpy.power(X,3))
+    assert(len(p) == 4)
+    return zcalib(p, z)
 
 def zcalib2(p, z):
     """
     Z calibration fitting function with 2 additional parameters.
     """
-    wo,c,d,A,B = p
-    X = (z-c)/d
-    return wo*numpy.sqrt(1.0 + numpy.power(X,2) + A * numpy.power(X,3) + B * numpy.power(X,4))
+    assert(len(p) == 5)
+    return zcalib(p, z)
 
 def zcalib3(p, z):
     """
     Z calibration fitting function with 3 additional parameters.
     """
-    wo,c,d,A,B,C = p
-    X = (z-c)/d
-    return wo*numpy.sqrt(1.0 + numpy.power(X,2) + A * numpy.power(X,3) + B * numpy.power(X,4) + C * numpy.power(X,5))
+    assert(len(p) == 6)
+    return zcalib(p, z)
 
 def zcalib4(p, z):
     """
     Z calibration fitting function with 4 additional parameters.
     """
-    wo,c,d,A,B,C,D = p
-    X = (z-c)/d
-    return wo*numpy.sqrt(1.0 + numpy.power(X,2) + A * numpy.power(X,3) + B * numpy.power(X,4) + C * numpy.power(X,5) + D * numpy.power(X,6))
+    assert(len(p) == 7)
+    return zcalib(p, z)
 
 zcalib_fitters = [zcalib0, zcalib1, zcalib2, zcalib3, zcalib4]
 
@@ -269,6 +269,16 @@ class MPFit(daoFitC.MultiFitter):
     def iterate(self):
         self.clib.mpIterateLM(self.mfit)
 
+    def iterateBatch(self, n_iterations):
+        """
+        The C library does not have a batch version of mpIterateLM() so
+        this just iterates in Python. Iterating is a NOP for peaks that
+        have already converged.
+        """
+        for i in range(n_iterations):
+            self.iterate()
+        return self.getUnconverged()
+
     def newBackground(self, background):
         """
         background - a list of background estimates of length n_channels.
@@ -43,6 +43,10 @@ def loadFFTFitC():
 
     fft_fit.mFitIterateLM.argtypes = [ctypes.c_void_p]
 
+    fft_fit.mFitIterateLMBatch.argtypes = [ctypes.c_void_p,
+                                           ctypes.c_int]
+    fft_fit.mFitIterateLMBatch.restype = ctypes.c_int
+
     fft_fit.mFitNewBackground.argtypes = [ctypes.c_void_p,
                                           ndpointer(dtype=numpy.float64)]    
     
@@ -42,6 +42,10 @@ def loadPupilFitC():
 
     pupil_fit.mFitIterateLM.argtypes = [ctypes.c_void_p]
 
+    pupil_fit.mFitIterateLMBatch.argtypes = [ctypes.c_void_p,
+                                             ctypes.c_int]
+    pupil_fit.mFitIterateLMBatch.restype = ctypes.c_int
+
     pupil_fit.mFitNewBackground.argtypes = [ctypes.c_void_p,
                                             ndpointer(dtype=numpy.float64)]    
     
@@ -172,6 +172,10 @@ def loadDaoFitC():
 
     daofit.mFitIterateLM.argtypes = [ctypes.c_void_p]
 
+    daofit.mFitIterateLMBatch.argtypes = [ctypes.c_void_p,
+                                          ctypes.c_int]
+    daofit.mFitIterateLMBatch.restype = ctypes.c_int
+
     daofit.mFitNewBackground.argtypes = [ctypes.c_void_p,
                                          ndpointer(dtype=numpy.float64)]
     
@@ -329,24 +333,24 @@ class MultiFitter(object):
                 print(spacing, self.n_significance, "peaks lost to low significance.")
                 print(spacing, self.iterations, "fitting iterations.")
 
-    def doFit(self, max_iterations = 2000):
+    def doFit(self, max_iterations = 2000, check_every = 20):
         """
         This is where the fitting actually happens.
 
-        FIXME: Why we always do at least one iteration? I guess it doesn't
-               matter because this should be a NOP as the C library will
-               not do anything if all the peaks have converged.
+        The iterations are done in blocks of check_every using iterateBatch()
+        to reduce the number of calls into the C library.
         """
         i = 0
-        self.iterate()
-        while(self.getUnconverged() and (i < max_iterations)):
-            if self.verbose and ((i%20)==0):
+        while(i < max_iterations):
+            if self.verbose:
                 print("iteration", i)
-            self.iterate()
-            i += 1
+            n_iter = min(check_every, max_iterations - i)
+            i += n_iter
+            if not self.iterateBatch(n_iter):
+                break
 
         if self.verbose:
-            if (i == max_iterations):
+            if self.getUnconverged():
                 print(" Failed to converge in:", i, self.getUnconverged())
             else:
                 print(" Multi-fit converged in:", i, self.getUnconverged())
@@ -360,7 +364,7 @@ class MultiFitter(object):
         Get the fit image, i.e. f(x), an image created from drawing all of
         the current fits into a 2D array.
         """
-        fit_image = numpy.ascontiguousarray(numpy.zeros(self.im_shape, dtype = numpy.float64))
+        fit_image = numpy.zeros(self.im_shape, dtype = numpy.float64)
         self.clib.mFitGetFitImage(self.mfit, fit_image)
         return fit_image
 
@@ -409,22 +413,24 @@ class MultiFitter(object):
             if(self.getNFit() == 0):
                 return numpy.zeros(0, dtype = numpy.float64)
                 
-            # Peak significance calculation.
+            # Peak significance calculation. This is done in place as
+            # bg_sum and fg_sum are temporary arrays.
             if(p_name == "significance"):
                 bg_sum = self.getPeakProperty("bg_sum")
                 fg_sum = self.getPeakProperty("fg_sum")
-                return fg_sum/numpy.sqrt(bg_sum)
+                fg_sum /= numpy.sqrt(bg_sum, out = bg_sum)
+                return fg_sum
     
         # Floating point properties.
         elif(self.peak_properties[p_name] == "float"):
             if (p_name == "jacobian"):
-                values = numpy.ascontiguousarray(numpy.zeros((self.getNFit(), self.mfit.contents.jac_size),
-                                                             dtype = numpy.float64))
+                values = numpy.zeros((self.getNFit(), self.mfit.contents.jac_size),
+                                     dtype = numpy.float64)
                 self.clib.mFitGetPeakPropertyDouble(self.mfit,
                                                     values,
                                                     ctypes.c_char_p(p_name.encode()))
             else:
-                values = numpy.ascontiguousarray(numpy.zeros(self.getNFit(), dtype = numpy.float64))
+                values = numpy.zeros(self.getNFit(), dtype = numpy.float64)
                 self.clib.mFitGetPeakPropertyDouble(self.mfit,
                                                     values,
                                                     ctypes.c_char_p(p_name.encode()))
@@ -432,7 +438,7 @@ class MultiFitter(object):
 
         # Integer properties.
         elif(self.peak_properties[p_name] == "int"):
-            values = numpy.ascontiguousarray(numpy.zeros(self.getNFit(), dtype = numpy.int32))
+            values = numpy.zeros(self.getNFit(), dtype = numpy.int32)
             self.clib.mFitGetPeakPropertyInt(self.mfit,
                                              values,
                                              ctypes.c_char_p(p_name.encode()))
@@ -442,7 +448,7 @@ class MultiFitter(object):
         """
         Get the residual, the data minus the fit image, xi - f(x).
         """
-        residual = numpy.ascontiguousarray(numpy.zeros(self.im_shape, dtype = numpy.float64))
+        residual = numpy.zeros(self.im_shape, dtype = numpy.float64)
         self.clib.mFitGetResidual(self.mfit, residual)
         return residual
 
@@ -468,14 +474,14 @@ class MultiFitter(object):
         if self.scmos_cal is None:
             if self.verbose:
                 print("Using zeros for sCMOS calibration data.")
-            self.scmos_cal = numpy.ascontiguousarray(numpy.zeros(image.shape), dtype = numpy.float64)
+            self.scmos_cal = numpy.zeros(image.shape, dtype = numpy.float64)
         else:
             self.scmos_cal = numpy.ascontiguousarray(self.scmos_cal, dtype = numpy.float64)
 
         if self.rqe is None:
             if self.verbose:
                 print("Using ones for relative quantum efficiency data.")
-            self.rqe = numpy.ascontiguousarray(numpy.ones(image.shape), dtype = numpy.float64)
+            self.rqe = numpy.ones(image.shape, dtype = numpy.float64)
         else:
             self.rqe = numpy.ascontiguousarray(self.rqe, dtype = numpy.float64)
 
@@ -493,6 +499,14 @@ class MultiFitter(object):
     def iterate(self):
         self.clib.mFitIterateLM(self.mfit)
 
+    def iterateBatch(self, n_iterations):
+        """
+        Perform up to n_iterations iterations of fitting, stopping early
+        if all of the peaks have converged. Returns the number of fits
+        that have not yet converged.
+        """
+        return self.clib.mFitIterateLMBatch(self.mfit, n_iterations)
+
     def newBackground(self, background):
         """
         Update the current background estimate.
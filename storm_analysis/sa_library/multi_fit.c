@@ -1349,6 +1349,32 @@ void mFitIterateLM(fitData *fit_data)
 }
 
 
+/*
+ * mFitIterateLMBatch
+ *
+ * Perform up to n_iterations iterations of fitting, stopping early
+ * if all of the peaks have converged. This is a convenience function
+ * that reduces the number of calls from Python into the C library.
+ *
+ * Returns the number of fits that have not yet converged.
+ *
+ * fit_data - Pointer to a fitData structure.
+ * n_iterations - The maximum number of iterations to perform.
+ */
+int mFitIterateLMBatch(fitData *fit_data, int n_iterations)
+{
+  int i,n_unconverged;
+
+  n_unconverged = mFitGetUnconverged(fit_data);
+  for(i=0;((i<n_iterations)&&(n_unconverged>0));i++){
+    mFitIterateLM(fit_data);
+    n_unconverged = mFitGetUnconverged(fit_data);
+  }
+
+  return n_unconverged;
+}
+
+
 /*
  * mFitNewBackground
  *
@@ -173,6 +173,7 @@ fitData *mFitInitialize(double *, double *, double, int, int);
 void mFitInitializeROIIndexing(fitData *, int);
 void mFitIterateOriginal(fitData *);
 void mFitIterateLM(fitData *);
+int mFitIterateLMBatch(fitData *, int);
 void mFitNewBackground(fitData *, double *);
 void mFitNewImage(fitData *, double *);
 void mFitNewPeaks(fitData *, int);
@@ -44,11 +44,13 @@ c_fitz.findMinimumDistance.restype = ctypes.c_double
 def calcSxSy(wx_params, wy_params, z):
     """
     Return sigma x and sigma y given the z calibration parameters.
+
+    z can be a single value or a numpy array of values.
     """
     zx = (z - wx_params[1])/wx_params[2]
-    sx = 0.5 * wx_params[0] * numpy.sqrt(1.0 + zx*zx + wx_params[3]*zx*zx*zx + wx_params[4]*zx*zx*zx*zx)
+    sx = 0.5 * wx_params[0] * numpy.sqrt(((wx_params[4]*zx + wx_params[3])*zx + 1.0)*zx*zx + 1.0)
     zy = (z - wy_params[1])/wy_params[2]
-    sy = 0.5 * wy_params[0] * numpy.sqrt(1.0 + zy*zy + wy_params[3]*zy*zy*zy + wy_params[4]*zy*zy*zy*zy)
+    sy = 0.5 * wy_params[0] * numpy.sqrt(((wy_params[4]*zy + wy_params[3])*zy + 1.0)*zy*zy + 1.0)
     return [sx, sy]
 
 
@@ -20,18 +20,18 @@ wy_params = numpy.array([2.0, -0.150, 0.40, 0.0, 0.0])
 def PSF(x, y, z, h):
     num_objects = x.size
     objects = numpy.zeros((num_objects, 5))
-    for i in range(num_objects):
-        [sx, sy] = fitzC.calcSxSy(wx_params, wy_params, z[i] * 0.001)
-        objects[i,:] = [x[i], y[i], h[i], sx, sy]
+    [sx, sy] = fitzC.calcSxSy(wx_params, wy_params, numpy.asarray(z) * 0.001)
+    objects[:,0] = x
+    objects[:,1] = y
+    objects[:,2] = h
+    objects[:,3] = sx
+    objects[:,4] = sy
 
     return objects
 
 def PSFIntegral(z, h):
-    integral = numpy.zeros(z.size)
-    for i in range(z.size):
-        [sx, sy] = fitzC.calcSxSy(wx_params, wy_params, z[i] * 0.001)
-        integral[i] = 2.0 * numpy.pi * h[i] * sx * sy
-    return integral
+    [sx, sy] = fitzC.calcSxSy(wx_params, wy_params, numpy.asarray(z) * 0.001)
+    return 2.0 * numpy.pi * numpy.asarray(h) * sx * sy
 
 if (__name__ == "__main__"):
     print(PSF(numpy.array([1]),
@@ -46,6 +46,10 @@ def loadCubicFitC():
 
     cubic_fit.mFitIterateLM.argtypes = [ctypes.c_void_p]
 
+    cubic_fit.mFitIterateLMBatch.argtypes = [ctypes.c_void_p,
+                                             ctypes.c_int]
+    cubic_fit.mFitIterateLMBatch.restype = ctypes.c_int
+
     cubic_fit.mFitNewBackground.argtypes = [ctypes.c_void_p,
                                             ndpointer(dtype=numpy.float64)]
     
@@ -107,6 +107,12 @@ def test_zcal_4():
     # Load data.
     [rt_wx, rt_wy, rt_z, px_size] = zCalibration.loadWxWyZData(h5_name, off_name)
     assert (rt_z.size == (zv.size - 10))
+    assert(numpy.allclose(rt_wx, wx[10:]))
+    assert(numpy.allclose(rt_z, zv[10:]))
+
+    # Load data with stage tilt correction.
+    [rt_wx, rt_wy, rt_z, px_size] = zCalibration.loadWxWyZData(h5_name, off_name, stage_tilt = [0.1, 0.01, 0.0])
+    assert(numpy.allclose(rt_z, zv[10:] + 0.11))
 
 
 def test_zcal_5():
@@ -154,7 +160,67 @@ def test_zcal_6():
     wx_params = [3.0, 0.3, 0.5]
     wy_params = [3.0, -0.3, 0.5]
     zCalibration.prettyPrint(wx_params, wy_params, 100.0)
-    
+
+
+def test_zcal_7():
+    """
+    Test the defocus curve functions against the direct expansion.
+    """
+    zv = numpy.arange(-0.6, 0.601, 0.01)
+    z_params = [3.0, 0.3, 0.5, 0.1, -0.2, 0.05, 0.02]
+    for i, zfn in enumerate(zCalibration.zcalib_fitters):
+        p = z_params[:3+i]
+        X = (zv - p[1])/p[2]
+        poly = 1.0 + X*X
+        for j in range(i):
+            poly += p[3+j]*numpy.power(X, 3+j)
+        assert(numpy.allclose(zfn(p, zv), p[0]*numpy.sqrt(poly)))
+
+
+def test_zcal_8():
+    """
+    Test the defocus curve Jacobian against finite differences.
+    """
+    zv = numpy.arange(-0.6, 0.601, 0.01)
+    z_params = [3.0, 0.3, 0.5, 0.1, -0.2, 0.05, 0.02]
+    dp = 1.0e-6
+    for i in range(5):
+        p = numpy.array(z_params[:3+i])
+        jac = zCalibration._zcalibJacobian(p, zv)
+        assert(jac.shape == (zv.size, p.size))
+        for j in range(p.size):
+            pp = numpy.copy(p)
+            pp[j] += dp
+            fd = (zCalibration.zcalib(pp, zv) - zCalibration.zcalib(p, zv))/dp
+            assert(numpy.allclose(jac[:,j], fd, atol = 1.0e-4, rtol = 1.0e-4))
+
+
+def test_zcal_9():
+    """
+    Test bounded and unbounded single fits.
+    """
+    zv = numpy.arange(-0.6, 0.601, 0.01)
+    z_params = [3.0, 0.3, 0.5, 0.1, -0.2]
+    ww = zCalibration.zcalib2(z_params, zv)
+
+    for bounded in [True, False]:
+        zf = zCalibration.doSingleFit(ww, zv, [3.0, 0.2, 0.4], 2, bounded = bounded)
+        assert(numpy.allclose(numpy.array(z_params), zf, atol = 1.0e-4, rtol = 1.0e-4))
+
+
+def test_zcal_10():
+    """
+    Test unit conversion of list and array parameters.
+    """
+    z_params = [3.0, 0.3, 0.5, 0.1]
+    for ww in [z_params, numpy.array(z_params)]:
+        cv = zCalibration.convertUnits(ww, 100.0)
+        assert(isinstance(cv, list))
+        assert(numpy.allclose(numpy.array(cv), numpy.array([300.0, 300.0, 500.0, 0.1, 0.0, 0.0, 0.0])))
+
+        # The input should not be modified.
+        assert(numpy.allclose(numpy.array(ww), numpy.array(z_params)))
+
 
 if (__name__ == "__main__"):
     test_zcal_1()
@@ -163,6 +229,10 @@ if (__name__ == "__main__"):
     test_zcal_4()
     test_zcal_5()
     test_zcal_6()
+    test_zcal_7()
+    test_zcal_8()
+    test_zcal_9()
+    test_zcal_10()
     
 
     
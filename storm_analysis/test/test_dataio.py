@@ -11,88 +11,53 @@ import storm_analysis.sa_library.datareader as datareader
 import storm_analysis.sa_library.datawriter as datawriter
 
 
-def test_io_1():
+# Movie frame shared by the simple movie IO tests.
+movie_h = 50
+movie_w = 40
+movie_l = 10
+movie_data = numpy.random.randint(0, 60000, (movie_h, movie_w)).astype(numpy.uint16)
+
+
+def movieRoundTrip(ext):
     """
-    Test DAX movie IO.
+    Write a movie with the given extension, read it back and check it.
     """
-    movie_h = 50
-    movie_w = 40
-    movie_l = 10
-    
-    data = numpy.random.randint(0, 60000, (movie_h, movie_w)).astype(numpy.uint16)
-
-    movie_name = storm_analysis.getPathOutputTest("test_dataio.dax")
+    movie_name = storm_analysis.getPathOutputTest("test_dataio" + ext)
 
-    # Write dax movie.
+    # Write movie.
     wr = datawriter.inferWriter(movie_name)
     for i in range(movie_l):
-        wr.addFrame(data)
+        wr.addFrame(movie_data)
     wr.close()
         
     # Read & check.
     rd = datareader.inferReader(movie_name)
     [mw, mh, ml] = rd.filmSize()
-    
+
     assert(mh == movie_h)
     assert(mw == movie_w)
     assert(ml == movie_l)
-    assert(numpy.allclose(data, rd.loadAFrame(0)))
+    assert(numpy.allclose(movie_data, rd.loadAFrame(0)))
 
     rd.close()
 
+def test_io_1():
+    """
+    Test DAX movie IO.
+    """
+    movieRoundTrip(".dax")
+
 def test_io_2():
     """
     Test TIF movie IO.
     """
-    movie_h = 50
-    movie_w = 40
-    movie_l = 10
-    
-    data = numpy.random.randint(0, 60000, (movie_h, movie_w)).astype(numpy.uint16)
-
-    movie_name = storm_analysis.getPathOutputTest("test_dataio.tif")
-
-    # Write tif movie.
-    wr = datawriter.inferWriter(movie_name)
-    for i in range(movie_l):
-        wr.addFrame(data)
-    wr.close()
-        
-    # Read & check.
-    rd = datareader.inferReader(movie_name)
-    [mw, mh, ml] = rd.filmSize()
-
-    assert(mh == movie_h)
-    assert(mw == movie_w)
-    assert(ml == movie_l)
-    assert(numpy.allclose(data, rd.loadAFrame(0)))
+    movieRoundTrip(".tif")
 
 def test_io_3():
     """
     Test FITS movie IO.
     """
-    movie_h = 50
-    movie_w = 40
-    movie_l = 10
-    
-    data = numpy.random.randint(0, 60000, (movie_h, movie_w)).astype(numpy.uint16)
-
-    movie_name = storm_analysis.getPathOutputTest("test_dataio.fits")
-
-    # Write FITS movie.
-    wr = datawriter.inferWriter(movie_name)
-    for i in range(movie_l):
-        wr.addFrame(data)
-    wr.close()
-        
-    # Read & check.
-    rd = datareader.inferReader(movie_name)
-    [mw, mh, ml] = rd.filmSize()
-
-    assert(mh == movie_h)
-    assert(mw == movie_w)
-    assert(ml == movie_l)
-    assert(numpy.allclose(data, rd.loadAFrame(0)))
+    movieRoundTrip(".fits")
     
 def test_io_4():
     """
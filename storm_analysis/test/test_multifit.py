@@ -499,6 +499,51 @@ def test_mfit_12():
 
     mfit.cleanup(verbose = False)
 
+def test_mfit_13():
+    """
+    Test batch iteration.
+    """
+    height = 20.0
+    sigma = 1.5
+    x_size = 100
+    y_size = 120
+    background = numpy.zeros((x_size, y_size)) + 10.0
+    image = dg.drawGaussians((x_size, y_size),
+                             numpy.array([[50.0, 50.0, height, sigma, sigma],
+                                          [50.0, 54.0, height, sigma, sigma]]))
+    image += background
+
+    mfit = daoFitC.MultiFitter2D(sigma_range = [1.0, 2.0])
+    mfit.initializeC(image)
+    mfit.newImage(image)
+    mfit.newBackground(background)
+
+    peaks = {"x" : numpy.array([50.0, 54.0]),
+             "y" : numpy.array([50.0, 50.0]),
+             "z" : numpy.array([0.0, 0.0]),
+             "sigma" : numpy.array([sigma, sigma])}
+
+    mfit.newPeaks(peaks, "finder")
+
+    # No iterations, neither peak has converged.
+    assert (mfit.iterateBatch(0) == 2)
+
+    # One iteration.
+    assert (mfit.iterateBatch(1) == mfit.getUnconverged())
+
+    # This should stop once all the peaks have converged.
+    assert (mfit.iterateBatch(2000) == 0)
+    assert (mfit.getUnconverged() == 0)
+
+    # Check peak x,y.
+    x = mfit.getPeakProperty("x")
+    y = mfit.getPeakProperty("y")
+    for i in range(x.size):
+        assert (abs(x[i] - peaks["x"][i]) < 1.0e-2)
+        assert (abs(y[i] - peaks["y"][i]) < 1.0e-2)
+
+    mfit.cleanup(verbose = False)
+
 
 if (__name__ == "__main__"):
     test_mfit_1()
@@ -513,4 +558,5 @@ if (__name__ == "__main__"):
     test_mfit_10()
     test_mfit_11()
     test_mfit_12()
+    test_mfit_13()
     